@@ -1,11 +1,13 @@
+import asyncio
 import logging
 import os
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List
 
-import requests
+import httpx
 from fastmcp import FastMCP
 from pydantic import BaseModel
-from requests import Request
+from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
 
 from review_processor import ReviewProcessor
@@ -27,30 +29,83 @@ class LLMInvokeInput(BaseModel):
 class LLMInvokeOutput(BaseModel):
     response_data: Dict[str, Any]
 
+class LLMBatchInvokeInput(BaseModel):
+    model_name: str
+    inputs: List[str]
+
+class LLMBatchInvokeOutput(BaseModel):
+    response_data: List[Dict[str, Any]]
+
 port = int(os.getenv("PORT", 8080))
-mcp = FastMCP(name="PR Review MCP Server")
+llm_api_token = os.getenv("LLM_API_TOKEN")
+llm_api_base_url = os.getenv("LLM_API_BASE_URL")
+llm_api_health_check_timeout = int(os.getenv("LLM_API_HEALTH_CHECK_TIMEOUT", 3))
 
 review_processor_instance = ReviewProcessor()
 logging.info("ReviewProcessor instance initialized in main.py.")
 
 
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    yield
+    await review_processor_instance.aclose()
+    logging.info("ReviewProcessor HTTP client closed on shutdown.")
+
+
+mcp = FastMCP(name="PR Review MCP Server", lifespan=lifespan)
+
+
 @mcp.tool(name="llm_invoke_model")
 async def llm_invoke_handler(input_data: LLMInvokeInput) -> LLMInvokeOutput:
-    logging.info(f"Received LLM invocation request for model: {input_data.model_name}")
-    logging.debug(f"LLM invocation payload inputs (first 200 chars): {input_data.inputs[:200]}...")
+    logging.info("Received LLM invocation request for model: %s", input_data.model_name)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("LLM invocation payload inputs (first 200 chars): %s...", input_data.inputs[:200])
     try:
-        raw_llm_response = review_processor_instance.invoke_llm_model(
+        raw_llm_response = await review_processor_instance.invoke_llm_model(
             payload={"inputs": input_data.inputs},
             model_name=input_data.model_name
         )
-        logging.info(f"Successfully invoked LLM model: {input_data.model_name}")
-        logging.debug(f"Raw LLM response: {raw_llm_response}")
+        logging.info("Successfully invoked LLM model: %s", input_data.model_name)
+        logging.debug("Raw LLM response: %s", raw_llm_response)
         return LLMInvokeOutput(response_data=raw_llm_response)
     except Exception as e:
         logging.error(f"Error during LLM invocation in handler for model {input_data.model_name}: {e}", exc_info=True)
         raise RuntimeError(f"Internal server error: {e}")
 
 
+@mcp.tool(name="llm_invoke_model_batch")
+async def llm_batch_invoke_handler(input_data: LLMBatchInvokeInput) -> LLMBatchInvokeOutput:
+    logging.info("Received batch LLM invocation request for model: %s with %d inputs",
+                 input_data.model_name, len(input_data.inputs))
+    try:
+        raw_llm_responses = await review_processor_instance.invoke_llm_models(
+            payloads=[{"inputs": inputs} for inputs in input_data.inputs],
+            model_name=input_data.model_name
+        )
+        logging.info("Successfully invoked LLM model in batch: %s", input_data.model_name)
+        return LLMBatchInvokeOutput(response_data=raw_llm_responses)
+    except Exception as e:
+        logging.error(f"Error during batch LLM invocation in handler for model {input_data.model_name}: {e}",
+                      exc_info=True)
+        raise RuntimeError(f"Internal server error: {e}")
+
+
+async def _check_llm_api() -> str:
+    if not llm_api_token or not llm_api_base_url:
+        logging.warning("LLM_API_TOKEN or LLM_API_BASE_URL not configured for health check.")
+        return "not_configured"
+
+    headers = {"Authorization": f"Bearer {llm_api_token}"}
+    test_url = f"{llm_api_base_url.rstrip('/')}/"
+    logging.debug("Attempting LLM API connectivity check to: %s with timeout %ss",
+                  test_url, llm_api_health_check_timeout)
+    async with httpx.AsyncClient(timeout=llm_api_health_check_timeout) as client:
+        response = await client.get(test_url, headers=headers)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("LLM API health check raw response status: %s, text: %s", response.status_code, response.text)
+    return "reachable" if response.is_success else f"unreachable (status: {response.status_code})"
+
+
 @mcp.custom_route("/health", methods=["GET"])
 async def health_check_mcp(request: Request) -> Response:
     logging.info(f"Received MCP health check request.")
@@ -59,38 +114,21 @@ async def health_check_mcp(request: Request) -> Response:
         "services": {}
     }
 
-    llm_api_token = os.getenv("LLM_API_TOKEN")
-    llm_api_base_url = os.getenv("LLM_API_BASE_URL")
-
-    llm_api_health_check_timeout = int(os.getenv("LLM_API_HEALTH_CHECK_TIMEOUT", 3))
-
-    try:
-        if llm_api_token and llm_api_base_url:
-            headers = {"Authorization": f"Bearer {llm_api_token}"}
-            test_url = f"{llm_api_base_url.rstrip('/')}/"
-            logging.debug(
-                f"Attempting LLM API connectivity check to: {test_url} with timeout {llm_api_health_check_timeout}s")
-            response = requests.get(
-                test_url,
-                headers=headers,
-                timeout=llm_api_health_check_timeout
-            )
-            status["services"][
-                "llm_api"] = "reachable" if response.ok else f"unreachable (status: {response.status_code})"
-            logging.info(f"LLM API connectivity check status: {status['services']['llm_api']}")
-            logging.debug(f"LLM API health check raw response status: {response.status_code}, text: {response.text}")
+    probes = {"llm_api": _check_llm_api()}
+    results = await asyncio.gather(*probes.values(), return_exceptions=True)
+    for service_name, result in zip(probes, results):
+        if isinstance(result, httpx.HTTPError):
+            logging.error("%s health check failed: %s", service_name, result, exc_info=result)
+            status["services"][service_name] = f"unreachable (error: {result})"
+        elif isinstance(result, BaseException):
+            logging.error("Unexpected error during %s health check: %s", service_name, result, exc_info=result)
+            status["services"][service_name] = f"unreachable (unexpected error: {result})"
         else:
-            status["services"]["llm_api"] = "not_configured"
-            logging.warning("LLM_API_TOKEN or LLM_API_BASE_URL not configured for health check.")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"LLM API health check failed: {e}", exc_info=True)
-        status["services"]["llm_api"] = f"unreachable (error: {e})"
-    except Exception as e:
-        logging.error(f"Unexpected error during LLM API health check: {e}", exc_info=True)
-        status["services"]["llm_api"] = f"unreachable (unexpected error: {e})"
+            status["services"][service_name] = result
+            logging.info("%s connectivity check status: %s", service_name, result)
 
-    logging.info(f"Returning MCP health check status: {status['status']}")
-    logging.debug(f"Full MCP health check response: {status}")
+    logging.info("Returning MCP health check status: %s", status['status'])
+    logging.debug("Full MCP health check response: %s", status)
     return JSONResponse(status, media_type="application/json")
 
 
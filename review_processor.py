@@ -1,12 +1,24 @@
+import asyncio
+import hashlib
 import os
 import logging
-import requests
-from typing import Dict
+import threading
+import httpx
+import orjson
+from typing import Dict, List
 
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from cachetools import TTLCache
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential_jitter, retry_if_exception
 
 logger = logging.getLogger(__name__)
 
+
+def _is_retryable_llm_error(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(exc, httpx.RequestError)
+
 class ReviewProcessor:
     def __init__(self):
         self.llm_api_base_url = os.getenv("LLM_API_BASE_URL")
@@ -14,6 +26,9 @@ class ReviewProcessor:
         self.llm_api_timeout = int(os.getenv("LLM_API_TIMEOUT", 600))
         self.llm_api_retries = int(os.getenv("LLM_API_RETRIES", 3))
         self.llm_api_retry_delay = int(os.getenv("LLM_API_RETRY_DELAY", 2))
+        self.llm_concurrency = int(os.getenv("LLM_CONCURRENCY", 8))
+        self.llm_cache_size = int(os.getenv("LLM_CACHE_SIZE", 256))
+        self.llm_cache_ttl = int(os.getenv("LLM_CACHE_TTL", 300))
 
         if not self.llm_api_base_url:
             logging.error("LLM_API_BASE_URL environment variable not set. Exiting.")
@@ -23,46 +38,110 @@ class ReviewProcessor:
             logging.error("LLM_API_TOKEN environment variable not set. Exiting.")
             raise ValueError("Missing LLM API token")
 
+        self._cache = TTLCache(maxsize=self.llm_cache_size, ttl=self.llm_cache_ttl)
+        self._cache_lock = asyncio.Lock()
+
+        self._base_url = self.llm_api_base_url.rstrip('/')
+        self._url_cache: Dict[str, str] = {}
+
+        self._clients: Dict[int, httpx.AsyncClient] = {}
+        self._clients_lock = threading.Lock()
+
         logger.info(f"ReviewProcessor initialized with LLM API Base URL: {self.llm_api_base_url}")
         logger.debug(
             f"LLM API Timeout: {self.llm_api_timeout}s, Retries: {self.llm_api_retries}, Retry Delay: {self.llm_api_retry_delay}s")
 
-    @retry(stop=stop_after_attempt(int(os.getenv("LLM_API_RETRIES", 3))),
-           wait=wait_fixed(int(os.getenv("LLM_API_RETRY_DELAY", 2))),
-           retry=retry_if_exception_type(requests.exceptions.RequestException),
-           reraise=True)
-    def invoke_llm_model(self, payload: Dict, model_name: str) -> Dict:
-        response = {}
-        headers = {"Authorization": f"Bearer {self.llm_api_token}"}
+    def _get_client(self) -> httpx.AsyncClient:
+        loop_id = id(asyncio.get_running_loop())
+        client = self._clients.get(loop_id)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(loop_id)
+                if client is None:
+                    client = httpx.AsyncClient(
+                        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                        timeout=self.llm_api_timeout,
+                        headers={
+                            "Authorization": f"Bearer {self.llm_api_token}",
+                            "Content-Type": "application/json"
+                        }
+                    )
+                    self._clients[loop_id] = client
+                    logger.debug("Created httpx.AsyncClient for event loop %s", loop_id)
+        return client
 
-        base_url = self.llm_api_base_url.rstrip('/')
-        api_url = f"{base_url}/{model_name}"
+    async def invoke_llm_model(self, payload: Dict, model_name: str) -> Dict:
+        api_url = self._url_cache.get(model_name)
+        if api_url is None:
+            api_url = self._url_cache.setdefault(model_name, f"{self._base_url}/{model_name}")
 
-        logger.debug(
-            f"Invoking LLM model at {api_url} with timeout {self.llm_api_timeout}s. Payload keys: {list(payload.keys())}")
+        cache_key = self._cache_key(payload, model_name)
+        async with self._cache_lock:
+            cached_response = self._cache.get(cache_key)
+        if cached_response is not None:
+            logger.info("LLM response cache hit for model: %s", model_name)
+            return cached_response
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Invoking LLM model at %s with timeout %ss. Payload keys: %s",
+                         api_url, self.llm_api_timeout, list(payload.keys()))
         try:
-            response = requests.post(
-                api_url,
-                headers=headers,
-                json=payload,
-                timeout=self.llm_api_timeout
-            )
-            response.raise_for_status()
-            logger.debug(f"LLM model {model_name} invocation successful. Status: {response.status_code}")
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"LLM API request failed for model {model_name} at {api_url}: {e}", exc_info=True)
-            if response is not None:
-                logger.error(f"LLM API response content: {response.text}")
+            async for attempt in AsyncRetrying(stop=stop_after_attempt(self.llm_api_retries),
+                                               wait=wait_exponential_jitter(initial=self.llm_api_retry_delay, max=30),
+                                               retry=retry_if_exception(_is_retryable_llm_error),
+                                               reraise=True):
+                with attempt:
+                    response = await self._get_client().post(api_url, content=orjson.dumps(payload))
+                    response.raise_for_status()
+            logger.debug("LLM model %s invocation successful. Status: %s", model_name, response.status_code)
+            response_data = orjson.loads(response.content)
+            async with self._cache_lock:
+                self._cache[cache_key] = response_data
+            return response_data
+        except httpx.HTTPError as e:
+            logger.error("LLM API request failed for model %s at %s: %s", model_name, api_url, e, exc_info=True)
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.error("LLM API response content: %s", e.response.text)
             return {
                 "summary": "PR Reviewed By PR BOT ",
                 "comments": [],
                 "security_issues": []
             }
         except Exception as e:
-            logger.error(f"An unexpected error occurred while invoking LLM: {e}", exc_info=True)
+            logger.error("An unexpected error occurred while invoking LLM: %s", e, exc_info=True)
             return {
                 "summary": "PR Reviewed By PR BOT ",
                 "comments": [],
                 "security_issues": []
-            }
\ No newline at end of file
+            }
+
+    @staticmethod
+    def _cache_key(payload: Dict, model_name: str) -> tuple:
+        payload_digest = hashlib.blake2b(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).digest()
+        return model_name, payload_digest
+
+    async def invoke_llm_models(self, payloads: List[Dict], model_name: str) -> List[Dict]:
+        keys = [self._cache_key(payload, model_name) for payload in payloads]
+        unique_payloads: Dict[tuple, Dict] = {}
+        for key, payload in zip(keys, payloads):
+            unique_payloads.setdefault(key, payload)
+
+        semaphore = asyncio.Semaphore(self.llm_concurrency)
+
+        async def _invoke_one(payload: Dict) -> Dict:
+            async with semaphore:
+                return await self.invoke_llm_model(payload, model_name)
+
+        logger.info("Dispatching %d concurrent LLM invocations (%d unique) for model: %s",
+                    len(payloads), len(unique_payloads), model_name)
+        unique_results = await asyncio.gather(*(_invoke_one(payload) for payload in unique_payloads.values()))
+        results_by_key = dict(zip(unique_payloads, unique_results))
+        return [results_by_key[key] for key in keys]
+
+    async def aclose(self):
+        logger.info("Closing ReviewProcessor HTTP clients.")
+        with self._clients_lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            await client.aclose()